@@ -0,0 +1,141 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from extract_perf import PerformanceExtractor, print_metrics
+from netlist import read_ac_sweep, set_ac_sweep
+from simulate import SimulationCache
+
+
+def read_ac(output_path):
+    return np.atleast_2d(np.genfromtxt(os.path.join(output_path, "ac.csv"), skip_header=1))
+
+
+def merge_ac(paths, output_path):
+    """Merge the ``ac.csv`` of several runs into one sorted, de-duplicated grid.
+
+    The header line and ``dc.csv`` of the first run are copied so the
+    result can be fed straight to ``PerformanceExtractor``.
+    """
+    with open(os.path.join(paths[0], "ac.csv")) as f:
+        header = f.readline()
+    rows = np.vstack([read_ac(path) for path in paths])
+    rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    _, first = np.unique(rows[:, 0], return_index=True)
+    rows = rows[first]
+
+    os.makedirs(output_path, exist_ok=True)
+    with open(os.path.join(output_path, "ac.csv"), "w") as f:
+        f.write(header)
+        for row in rows:
+            f.write(" " + " ".join("%.7e" % x for x in row) + " \n")
+    shutil.copy(os.path.join(paths[0], "dc.csv"), os.path.join(output_path, "dc.csv"))
+    return output_path
+
+
+class AdaptiveACAnalyzer(object):
+    """Two-pass AC analysis that only spends points around the UGBW.
+
+    A coarse log sweep over the deck's own ``.ac`` range locates the
+    unity-gain crossing; a dense linear sweep over
+    ``[ugbw / span, ugbw * span]`` then resolves it, and both results are
+    merged before running ``PerformanceExtractor``. PM is read at the UGBW,
+    so the same window refines both.
+    """
+
+    def __init__(
+        self,
+        netlist_path,
+        cache_dir,
+        coarse_points_per_decade=5,
+        dense_points=41,
+        span=2.0,
+        simulator="ngspice",
+        timeout=None,
+        analysis_timeout=None,
+    ):
+        with open(netlist_path) as f:
+            self.netlist = f.read()
+        self.source_dir = os.path.dirname(os.path.abspath(netlist_path))
+        self.cache = SimulationCache(
+            cache_dir, simulator=simulator, timeout=timeout, analysis_timeout=analysis_timeout
+        )
+        self.coarse_points_per_decade = coarse_points_per_decade
+        self.dense_points = dense_points
+        self.span = span
+        _, _, self.fstart, self.fstop = read_ac_sweep(self.netlist)
+
+    def _run(self, variation, points, fstart, fstop):
+        """Simulate the deck with another ``.ac`` card; raises ``SimulationError``.
+
+        Returns the run dir and the cache key of the simulated netlist.
+        """
+        netlist = set_ac_sweep(self.netlist, variation, points, fstart, fstop)
+        return self.cache.run(netlist, self.source_dir), self.cache.key(netlist)
+
+    def run_fixed(self, points_per_decade):
+        """Run a plain ``dec`` sweep; returns ``(metrics, points simulated)``."""
+        run_dir, _ = self._run("dec", points_per_decade, self.fstart, self.fstop)
+        return PerformanceExtractor(run_dir).extract(), len(read_ac(run_dir))
+
+    def run(self):
+        """Return ``(metrics, points simulated)`` of the adaptive sweep.
+
+        If the coarse sweep has no unity-gain crossing there is nothing to
+        refine and its metrics are returned as is.
+        """
+        coarse_dir, coarse_key = self._run("dec", self.coarse_points_per_decade, self.fstart, self.fstop)
+        freq, vout, _ = PerformanceExtractor(coarse_dir).parse_output(coarse_dir)
+        points = len(freq)
+        ugbw, valid = PerformanceExtractor.find_ugbw(freq, vout)
+        if not valid:
+            return PerformanceExtractor(coarse_dir).extract(), points
+
+        f_lo = max(self.fstart, ugbw / self.span)
+        f_hi = min(self.fstop, ugbw * self.span)
+        dense_dir, dense_key = self._run("lin", self.dense_points, f_lo, f_hi)
+        points += len(read_ac(dense_dir))
+
+        merged_dir = os.path.join(self.cache.cache_dir, "adaptive-%s-%s" % (coarse_key, dense_key))
+        merge_ac([coarse_dir, dense_dir], merged_dir)
+        return PerformanceExtractor(merged_dir).extract(), points
+
+
+def compare_with_fixed_grid(analyzer, points_per_decade, reference_points_per_decade=200):
+    """Compare the adaptive sweep with a fixed ``dec`` grid.
+
+    Errors are measured against a very dense fixed grid. Returns a dict of
+    ``{"adaptive"|"fixed": {"points": ..., "ugbw_err": ..., "pm_err": ...}}``
+    with the UGBW error relative and the PM error in degrees.
+    """
+    reference, _ = analyzer.run_fixed(reference_points_per_decade)
+    runs = {
+        "adaptive": analyzer.run(),
+        "fixed": analyzer.run_fixed(points_per_decade),
+    }
+    report = {}
+    for name, (metrics, points) in runs.items():
+        report[name] = {
+            "points": points,
+            "ugbw_err": abs(float(metrics["ugbw"]) / float(reference["ugbw"]) - 1),
+            "pm_err": abs(float(metrics["pm"]) - float(reference["pm"])),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    analyzer = AdaptiveACAnalyzer(sys.argv[1], sys.argv[2])
+    metrics, points = analyzer.run()
+    print_metrics(metrics)
+    print("points simulated: %d" % points)
+
+    variation, baseline_points, _, _ = read_ac_sweep(analyzer.netlist)
+    if variation == "dec":
+        report = compare_with_fixed_grid(analyzer, baseline_points)
+        for name, row in report.items():
+            print(
+                "%-8s points=%-5d ugbw_err=%.2e pm_err=%.3f (degrees)"
+                % (name, row["points"], row["ugbw_err"], row["pm_err"])
+            )
@@ -0,0 +1,258 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from netlist import set_control
+
+
+OUTPUT_NAME = "results.meas"
+
+
+class ControlScript(object):
+    """Generator for a ``.control`` block that writes a single output file.
+
+    Every ``meas`` and ``let`` result and every requested vector of every
+    analysis is appended to ``output`` (``echo ... >>`` for measurements,
+    ``wrdata`` with ``appendwrite`` for vectors), instead of one ``wrdata``
+    file per quantity. ``read_measurements`` parses the result in one read.
+    """
+
+    def __init__(self, output=OUTPUT_NAME):
+        self.output = output
+        self.analyses = []
+
+    def analysis(self, command, meas=(), lets=(), vectors=(), label=None):
+        """Add an analysis command (e.g. ``run``, ``op``, ``ac dec 10 1 10G``).
+
+        ``meas`` entries are ``meas`` statements without the leading
+        ``meas`` keyword; the result name is their second token. ``lets``
+        entries (``"TC = ppavl/avgval/165"``) are ``let`` statements run
+        after all measurements, so they can combine them; their results
+        are written out like measurements.
+        """
+        label = label or command.split()[0]
+        if any(label == other[0] for other in self.analyses):
+            raise ValueError("duplicate analysis label: %s" % label)
+        self.analyses.append((label, command, list(meas), list(lets), list(vectors)))
+        return self
+
+    def render(self):
+        out = self.output
+        lines = [
+            ".control",
+            "set units=degrees",
+            "set wr_vecnames",
+            "set wr_singlescale",
+            "option numdgt=7",
+            # truncate any output left over from a previous run
+            "echo @run > %s" % out,
+            "set appendwrite",
+        ]
+        for label, command, meas, lets, vectors in self.analyses:
+            lines.append(command)
+            names = []
+            for statement in meas:
+                lines.append("meas %s" % statement)
+                names.append(statement.split()[1])
+            for statement in lets:
+                lines.append("let %s" % statement)
+                names.append(statement.partition("=")[0].strip())
+            if names:
+                lines.append("echo @meas %s >> %s" % (label, out))
+                lines.extend("echo %s $&%s >> %s" % (name, name, out) for name in names)
+            if vectors:
+                lines.append("echo @vectors %s >> %s" % (label, out))
+                lines.append("wrdata %s %s" % (out, " ".join(vectors)))
+        lines.append(".endc")
+        return "\n".join(lines) + "\n"
+
+    def apply(self, netlist):
+        """Return ``netlist`` with its ``.control`` block replaced by this one."""
+        return set_control(netlist, self.render())
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def _parse_vectors(label, lines, data):
+    if not lines:
+        return
+    names = lines[0].split()
+    rows = np.array([[_to_float(x) for x in line.split()] for line in lines[1:]], ndmin=2)
+    if rows.size == 0:
+        rows = np.empty((0, len(names)))
+
+    i = 0
+    while i < len(names):
+        key = "%s/%s" % (label, names[i])
+        # wrdata writes complex vectors as two columns under the same name
+        if i + 1 < len(names) and names[i + 1] == names[i]:
+            data[key] = rows[:, i] + 1j * rows[:, i + 1]
+            i += 2
+        else:
+            data[key] = rows[:, i]
+            i += 1
+
+
+def read_measurements(path):
+    """Read an output written by a ``ControlScript`` in a single pass.
+
+    Returns a dict of arrays: measurements and ``let`` results under their
+    own name (one element per value, NaN if the measurement failed) and
+    vectors under
+    ``"<label>/<vector>"``, e.g. ``data["ac/frequency"]``. Complex vectors
+    come back as complex arrays.
+    """
+    with open(path) as f:
+        text = f.read()
+
+    data = {}
+    kind, label, block = None, None, []
+
+    def flush():
+        if kind == "meas":
+            for line in block:
+                name, _, value = line.partition(" ")
+                values = [_to_float(x) for x in value.split()] or [np.nan]
+                data[name] = np.array(values)
+        elif kind == "vectors":
+            _parse_vectors(label, block, data)
+
+    for line in text.splitlines():
+        if line.startswith("@"):
+            flush()
+            kind, _, label = line[1:].strip().partition(" ")
+            block = []
+        elif line.strip():
+            block.append(line)
+    flush()
+    return data
+
+
+def _write_table(f, names, rows):
+    """Write ``rows`` the way ``wrdata`` with ``wr_vecnames`` does."""
+    f.write(" " + " ".join("%-14s" % name for name in names) + "\n")
+    for row in rows:
+        f.write(" " + " ".join("%.7e" % x for x in row) + " \n")
+
+
+def _read_table(label, path, data):
+    with open(path) as f:
+        _parse_vectors(label, [line for line in f.read().splitlines() if line.strip()], data)
+
+
+def _write_legacy(run_dir, ac, dc, meas):
+    """Write the three wrdata files of ``CLIA-get-pm-directly.cir``."""
+    with open(os.path.join(run_dir, "ac.csv"), "w") as f:
+        _write_table(f, ["frequency", "v(opout)", "v(opout)"], ac)
+    with open(os.path.join(run_dir, "dc.csv"), "w") as f:
+        _write_table(f, ["vdd", "i(V1)"], [dc])
+    # wrdata repeats scalar measurements once per point of the sweep
+    with open(os.path.join(run_dir, "CLIA_GBW_PM"), "w") as f:
+        names, rows = [], []
+        for name, value in meas.items():
+            names += ["frequency", name]
+            rows.append(np.column_stack([ac[:, 0], np.full(len(ac), value)]))
+        _write_table(f, names, np.hstack(rows))
+
+
+def _read_legacy(run_dir):
+    data = {}
+    _read_table("ac", os.path.join(run_dir, "ac.csv"), data)
+    _read_table("op", os.path.join(run_dir, "dc.csv"), data)
+    _read_table("meas", os.path.join(run_dir, "CLIA_GBW_PM"), data)
+    return data
+
+
+def _write_consolidated(run_dir, ac, dc, meas):
+    """Write ``ac``/``dc``/``meas`` in the layout a ``ControlScript`` produces."""
+    with open(os.path.join(run_dir, OUTPUT_NAME), "w") as f:
+        f.write("@run\n@meas ac\n")
+        for name, value in meas.items():
+            f.write("%s %.7e\n" % (name, value))
+        f.write("@vectors ac\n")
+        _write_table(f, ["frequency", "v(opout)", "v(opout)"], ac)
+        f.write("@vectors op\n")
+        _write_table(f, ["vdd", "i(V1)"], [dc])
+
+
+def _read_consolidated(run_dir):
+    return read_measurements(os.path.join(run_dir, OUTPUT_NAME))
+
+
+def benchmark(fixture_dir="circuits/CLIA", runs=200):
+    """Compare the current wrdata layout with the consolidated one.
+
+    The data of the checked-in ``ac.csv``/``dc.csv``/``CLIA_GBW_PM`` of
+    ``fixture_dir`` is written into ``runs`` fresh run directories in each
+    layout, then read back. Both layouts are written by the same table
+    writer and read by the same table parser (``_parse_vectors``), so the
+    difference is down to the number and size of files. Returns
+    ``{layout: {"files", "bytes", "write_seconds", "read_seconds"}}`` per
+    run.
+
+    The consolidated files are written by Python in the format
+    ``ControlScript`` is meant to make ngspice produce; that format has not
+    been checked against output of a real ngspice run.
+    """
+    ac = np.genfromtxt(os.path.join(fixture_dir, "ac.csv"), skip_header=1)
+    dc = np.genfromtxt(os.path.join(fixture_dir, "dc.csv"), skip_header=1)
+    gbw_pm = pd.read_csv(os.path.join(fixture_dir, "CLIA_GBW_PM"), sep=r"\s+")
+    meas = {name: gbw_pm.iloc[0][name] for name in ("gain_bandwidth_product", "phase_margin")}
+
+    layouts = (
+        ("legacy", _write_legacy, _read_legacy),
+        ("consolidated", _write_consolidated, _read_consolidated),
+    )
+    root = tempfile.mkdtemp()
+    try:
+        report = {}
+        for layout, writer, reader in layouts:
+            run_dirs = [os.path.join(root, layout, str(i)) for i in range(runs)]
+            for run_dir in run_dirs:
+                os.makedirs(run_dir)
+
+            start = time.perf_counter()
+            for run_dir in run_dirs:
+                writer(run_dir, ac, dc, meas)
+            write_seconds = (time.perf_counter() - start) / runs
+
+            start = time.perf_counter()
+            for run_dir in run_dirs:
+                reader(run_dir)
+            read_seconds = (time.perf_counter() - start) / runs
+
+            names = os.listdir(run_dirs[0])
+            report[layout] = {
+                "files": len(names),
+                "bytes": sum(os.path.getsize(os.path.join(run_dirs[0], n)) for n in names),
+                "write_seconds": write_seconds,
+                "read_seconds": read_seconds,
+            }
+        return report
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    report = benchmark(*sys.argv[1:2])
+    for layout, row in report.items():
+        print(
+            "%-12s files=%d bytes=%d write=%.3f ms/run read=%.3f ms/run"
+            % (
+                layout,
+                row["files"],
+                row["bytes"],
+                row["write_seconds"] * 1e3,
+                row["read_seconds"] * 1e3,
+            )
+        )
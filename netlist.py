@@ -0,0 +1,160 @@
+import os
+import re
+
+
+SPICE_SUFFIXES = {
+    "f": 1e-15,
+    "p": 1e-12,
+    "n": 1e-9,
+    "u": 1e-6,
+    "m": 1e-3,
+    "k": 1e3,
+    "meg": 1e6,
+    "g": 1e9,
+    "t": 1e12,
+}
+
+_VALUE_RE = re.compile(
+    r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|[fpnumkgt])?[a-z]*$", re.I
+)
+_PARAM_ASSIGN_RE = re.compile(r"([A-Za-z_]\w*)(\s*=\s*)([^\s=]+)")
+_INCLUDE_RE = re.compile(
+    r"^(\s*\.(include|inc|lib)\s+)(['\"]?)([^'\"\s]+)\3(.*)$", re.I
+)
+
+
+def parse_value(text):
+    """Convert a SPICE number such as ``630n`` or ``247.56K`` to a float."""
+    match = _VALUE_RE.match(text.strip().strip("'\""))
+    if match is None:
+        raise ValueError("not a SPICE number: %r" % text)
+    number, suffix = match.groups()
+    scale = SPICE_SUFFIXES[suffix.lower()] if suffix else 1.0
+    return float(number) * scale
+
+
+def format_value(value):
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return "%.9g" % value
+
+
+def _param_lines(lines):
+    """Yield the indices of lines belonging to a ``.param`` statement."""
+    in_param = False
+    for i, line in enumerate(lines):
+        stripped = line.lstrip()
+        if stripped.startswith("+"):
+            if in_param:
+                yield i
+            continue
+        in_param = stripped.lower().startswith(".param")
+        if in_param:
+            yield i
+
+
+def read_params(netlist):
+    """Return the numeric ``.param`` definitions of a netlist as a dict.
+
+    Expressions (e.g. ``'supply_voltage*VCM_ratio'``) are skipped.
+    """
+    lines = netlist.splitlines()
+    params = {}
+    for i in _param_lines(lines):
+        for name, _, value in _PARAM_ASSIGN_RE.findall(lines[i]):
+            try:
+                params[name] = parse_value(value)
+            except ValueError:
+                continue
+    return params
+
+
+def set_params(netlist, overrides):
+    """Return a copy of ``netlist`` with ``.param`` values replaced.
+
+    Names are matched case-insensitively, as ngspice does. Raises ``KeyError``
+    if one of ``overrides`` is not defined in the netlist.
+    """
+    values = {name.lower(): format_value(v) for name, v in overrides.items()}
+    found = set()
+
+    def substitute(match):
+        name, assign, _ = match.groups()
+        if name.lower() not in values:
+            return match.group(0)
+        found.add(name.lower())
+        return name + assign + values[name.lower()]
+
+    lines = netlist.splitlines(keepends=True)
+    for i in _param_lines(lines):
+        lines[i] = _PARAM_ASSIGN_RE.sub(substitute, lines[i])
+
+    missing = set(values) - found
+    if missing:
+        raise KeyError("parameters not defined in netlist: %s" % sorted(missing))
+    return "".join(lines)
+
+
+def absolutize_includes(netlist, base_dir):
+    """Rewrite relative ``.include``/``.lib`` paths against ``base_dir``.
+
+    This lets a netlist be simulated from a different working directory
+    than the one it was written for.
+    """
+    base_dir = os.path.abspath(base_dir)
+    out = []
+    for line in netlist.splitlines(keepends=True):
+        match = _INCLUDE_RE.match(line.rstrip("\r\n"))
+        if match is not None:
+            prefix, kind, quote, path, rest = match.groups()
+            # a bare ".lib <section>" only opens a section of a library file
+            is_section = kind.lower() == "lib" and not rest.strip()
+            if not is_section and not os.path.isabs(path):
+                path = os.path.join(base_dir, path)
+                ending = line[len(line.rstrip("\r\n")):]
+                line = prefix + quote + path + quote + rest + ending
+        out.append(line)
+    return "".join(out)
+
+
+_AC_CARD_RE = re.compile(r"^\s*\.ac\s+(dec|oct|lin)\s+(\S+)\s+(\S+)\s+(\S+)", re.I)
+
+
+def read_ac_sweep(netlist):
+    """Return ``(variation, points, fstart, fstop)`` of the ``.ac`` card."""
+    for line in netlist.splitlines():
+        match = _AC_CARD_RE.match(line)
+        if match is not None:
+            variation, points, fstart, fstop = match.groups()
+            return variation.lower(), int(parse_value(points)), parse_value(fstart), parse_value(fstop)
+    raise ValueError("netlist has no .ac card")
+
+
+def set_ac_sweep(netlist, variation, points, fstart, fstop):
+    """Return a copy of ``netlist`` with its ``.ac`` card replaced."""
+    card = ".ac %s %d %s %s" % (variation, points, format_value(fstart), format_value(fstop))
+    lines = netlist.splitlines(keepends=True)
+    for i, line in enumerate(lines):
+        if _AC_CARD_RE.match(line):
+            lines[i] = card + line[len(line.rstrip("\r\n")):]
+            return "".join(lines)
+    raise ValueError("netlist has no .ac card")
+
+
+_CONTROL_RE = re.compile(r"^\s*\.control\b.*?^\s*\.endc\b[^\n]*\n?", re.I | re.M | re.S)
+_END_RE = re.compile(r"^\s*\.end\s*$", re.I | re.M)
+
+
+def set_control(netlist, control):
+    """Return a copy of ``netlist`` with its ``.control`` block replaced.
+
+    Without an existing block, ``control`` is inserted before ``.end``.
+    """
+    if not control.endswith("\n"):
+        control += "\n"
+    if _CONTROL_RE.search(netlist):
+        return _CONTROL_RE.sub(lambda _: control, netlist, count=1)
+    match = _END_RE.search(netlist)
+    if match is None:
+        return netlist + control
+    return netlist[: match.start()] + control + netlist[match.start():]
@@ -0,0 +1,249 @@
+import json
+import math
+import sqlite3
+import sys
+
+import numpy as np
+
+from extract_perf import PerformanceExtractor
+
+
+METRICS = ["gain", "gain_db", "ugbw", "pm", "power"]
+
+DEFAULT_OBJECTIVES = {"gain": "max", "ugbw": "max", "pm": "max", "power": "min"}
+
+
+def _row_metrics(metrics):
+    row = {m: float(metrics[m]) for m in METRICS if m in metrics}
+    if "gain_db" not in row and "gain" in row:
+        row["gain_db"] = float(20 * np.log10(row["gain"])) if row["gain"] > 0 else math.nan
+    return [None if m not in row or math.isnan(row[m]) else row[m] for m in METRICS]
+
+
+class ResultsStore(object):
+    """SQLite store of evaluated designs with an incrementally kept Pareto set.
+
+    Every metric column is indexed, so range queries and top-k per metric
+    are index scans. The non-dominated set over ``objectives`` (a dict of
+    metric -> ``"max"``/``"min"``) lives in its own table: an insert is
+    checked only against the current front and evicts the members it
+    dominates, instead of recomputing the front over all designs.
+    Designs equal to a front member on every objective are not added to
+    the front.
+    """
+
+    def __init__(self, db_path, objectives=None):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.objectives = self._init_schema(dict(objectives or DEFAULT_OBJECTIVES))
+        self._signs = [1.0 if d == "max" else -1.0 for d in self.objectives.values()]
+
+    def _init_schema(self, objectives):
+        for metric, direction in objectives.items():
+            if metric not in METRICS or direction not in ("max", "min"):
+                raise ValueError("invalid objective: %s=%s" % (metric, direction))
+
+        c = self.conn
+        c.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        stored = c.execute("SELECT value FROM meta WHERE key = 'objectives'").fetchone()
+        if stored is not None:
+            if json.loads(stored[0]) != objectives:
+                raise ValueError("store was created with objectives %s" % stored[0])
+        else:
+            c.execute("INSERT INTO meta VALUES ('objectives', ?)", (json.dumps(objectives),))
+
+        columns = ", ".join("%s REAL" % m for m in METRICS)
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS designs "
+            "(id INTEGER PRIMARY KEY, path TEXT, params TEXT, %s)" % columns
+        )
+        for m in METRICS:
+            c.execute("CREATE INDEX IF NOT EXISTS idx_designs_%s ON designs (%s)" % (m, m))
+
+        # objective values are stored sign-normalized so larger is always better
+        objective_columns = ", ".join("o%d REAL" % i for i in range(len(objectives)))
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS pareto "
+            "(id INTEGER PRIMARY KEY REFERENCES designs (id), %s)" % objective_columns
+        )
+        c.execute("CREATE INDEX IF NOT EXISTS idx_pareto_o0 ON pareto (o0)")
+        c.commit()
+        return objectives
+
+    def close(self):
+        # refresh planner statistics so multi-metric queries pick the best index
+        self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+    def _update_front(self, design_id, row):
+        values = [row[METRICS.index(m)] for m in self.objectives]
+        if any(v is None for v in values):
+            return
+        point = [s * v for s, v in zip(self._signs, values)]
+        n = len(point)
+
+        ge = " AND ".join("o%d >= ?" % i for i in range(n))
+        if self.conn.execute("SELECT 1 FROM pareto WHERE %s LIMIT 1" % ge, point).fetchone():
+            return
+        le = " AND ".join("o%d <= ?" % i for i in range(n))
+        self.conn.execute("DELETE FROM pareto WHERE %s" % le, point)
+        self.conn.execute(
+            "INSERT INTO pareto VALUES (?, %s)" % ", ".join("?" * n), [design_id] + point
+        )
+
+    def add_many(self, results):
+        """Insert ``(metrics, params, path)`` tuples in one transaction.
+
+        ``metrics`` is a ``PerformanceExtractor.extract()`` dict; ``params``
+        (a dict) and ``path`` may be ``None``. Returns the new row ids.
+        """
+        ids = []
+        insert = "INSERT INTO designs (path, params, %s) VALUES (?, ?, %s)" % (
+            ", ".join(METRICS),
+            ", ".join("?" * len(METRICS)),
+        )
+        with self.conn:
+            for metrics, params, path in results:
+                row = _row_metrics(metrics)
+                params = json.dumps(params) if params is not None else None
+                design_id = self.conn.execute(insert, [path, params] + row).lastrowid
+                self._update_front(design_id, row)
+                ids.append(design_id)
+        return ids
+
+    def add(self, metrics, params=None, path=None):
+        return self.add_many([(metrics, params, path)])[0]
+
+    def add_output(self, output_path, params=None):
+        """Extract the metrics of a simulation output directory and store them."""
+        return self.add(PerformanceExtractor(output_path).extract(), params, output_path)
+
+    def _select(self, sql, args):
+        cursor = self.conn.execute(sql, args)
+        names = [d[0] for d in cursor.description]
+        rows = []
+        for values in cursor:
+            row = dict(zip(names, values))
+            if row.get("params") is not None:
+                row["params"] = json.loads(row["params"])
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _where(where):
+        clauses, args = [], []
+        for metric, (low, high) in (where or {}).items():
+            if metric not in METRICS:
+                raise ValueError("unknown metric: %s" % metric)
+            if low is not None:
+                clauses.append("%s >= ?" % metric)
+                args.append(low)
+            if high is not None:
+                clauses.append("%s <= ?" % metric)
+                args.append(high)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, where=None, limit=None):
+        """Return designs with every metric inside its ``(low, high)`` range.
+
+        Either bound may be ``None``, e.g.
+        ``query({"gain_db": (80, None), "pm": (60, None), "power": (None, 20e-6)})``.
+        """
+        sql, args = self._where(where)
+        sql = "SELECT * FROM designs" + sql
+        if limit is not None:
+            sql += " LIMIT %d" % limit
+        return self._select(sql, args)
+
+    def _capped_count(self, metric, low, high, cap):
+        sql, args = self._where({metric: (low, high)})
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM designs INDEXED BY idx_designs_%s%s LIMIT %d)"
+            % (metric, sql, cap),
+            args,
+        ).fetchone()[0]
+
+    def _narrowest_filter(self, metric, where, cap):
+        """Return ``(count, metric)`` of the filter matching the fewest rows.
+
+        Counts stop at ``cap``; the sort ``metric`` itself is not considered.
+        Returns ``None`` when there is no other filter.
+        """
+        counts = [
+            (self._capped_count(m, low, high, cap), m)
+            for m, (low, high) in (where or {}).items()
+            if m != metric
+        ]
+        return min(counts) if counts else None
+
+    def _budget_bound(self, metric, descending, budget):
+        """Return the ``metric`` value ``budget`` rows into its index, if any."""
+        row = self.conn.execute(
+            "SELECT %s FROM designs INDEXED BY idx_designs_%s WHERE %s IS NOT NULL "
+            "ORDER BY %s %s LIMIT 1 OFFSET %d"
+            % (metric, metric, metric, metric, "DESC" if descending else "ASC", budget - 1)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _top_k_sql(self, metric, k, where, descending, index, bound=None):
+        """Build a top-k query forced onto ``index``.
+
+        ``bound`` stops a walk of the sort index at that ``metric`` value.
+        """
+        where = dict(where or {})
+        if bound is not None:
+            low, high = where.get(metric, (None, None))
+            if descending:
+                low = bound if low is None else max(low, bound)
+            else:
+                high = bound if high is None else min(high, bound)
+            where[metric] = (low, high)
+        sql, args = self._where(where)
+        sql += (" AND " if sql else " WHERE ") + "%s IS NOT NULL" % metric
+        return (
+            "SELECT * FROM designs INDEXED BY idx_designs_%s%s ORDER BY %s %s LIMIT %d"
+            % (index, sql, metric, "DESC" if descending else "ASC", k),
+            args,
+        )
+
+    def top_k(self, metric, k, where=None, descending=True, cap=10000, budget=2000):
+        """Return the ``k`` best designs by ``metric`` among those matching ``where``.
+
+        If one filter alone matches fewer than ``cap`` rows, its matches are
+        fetched through its index and sorted. Otherwise at most the first
+        ``budget`` rows of the sort metric's index are walked, which finds
+        the top ``k`` quickly for loose specs; if that yields fewer than
+        ``k`` designs (a selective or infeasible spec), the query falls back
+        to fetching the rows of the narrowest filter and sorting them.
+        Designs without a value for ``metric`` are never returned.
+        """
+        if metric not in METRICS:
+            raise ValueError("unknown metric: %s" % metric)
+        narrowest = self._narrowest_filter(metric, where, cap)
+        if narrowest is not None and narrowest[0] < cap:
+            return self._select(*self._top_k_sql(metric, k, where, descending, narrowest[1]))
+
+        bound = self._budget_bound(metric, descending, budget)
+        rows = self._select(*self._top_k_sql(metric, k, where, descending, metric, bound))
+        if len(rows) == k or bound is None:
+            return rows
+        index = narrowest[1] if narrowest is not None else metric
+        return self._select(*self._top_k_sql(metric, k, where, descending, index))
+
+    def pareto_front(self):
+        return self._select(
+            "SELECT designs.* FROM designs JOIN pareto ON designs.id = pareto.id "
+            "ORDER BY designs.id",
+            [],
+        )
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM designs").fetchone()[0]
+
+
+if __name__ == "__main__":
+    store = ResultsStore(sys.argv[1])
+    for output_path in sys.argv[2:]:
+        store.add_output(output_path)
+    print("%d designs, %d on the Pareto front" % (len(store), len(store.pareto_front())))
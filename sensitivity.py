@@ -0,0 +1,155 @@
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from extract_perf import PerformanceExtractor
+from netlist import read_params, set_params
+from simulate import SimulationCache, SimulationError
+
+
+logger = logging.getLogger(__name__)
+
+METRICS = ["gain", "ugbw", "pm", "power"]
+
+# relative finite-difference step per tunable parameter type
+DEFAULT_REL_STEPS = {
+    "W": 0.01,
+    "L": 0.01,
+    "M": 0.05,
+    "CURRENT": 0.01,
+    "CAPACITOR": 0.02,
+    "RESISTOR": 0.02,
+}
+
+TUNABLE_RE = re.compile(r"^(MOSFET_\w+_[WLM]_\w+|CURRENT_\w+|CAPACITOR_\w+|RESISTOR_\w+)$", re.I)
+_MOSFET_KIND_RE = re.compile(r"^MOSFET_\d+_\d+_([WLM])_", re.I)
+
+
+def param_kind(name):
+    """Map a tunable parameter name to a key of ``DEFAULT_REL_STEPS``.
+
+    ``MOSFET_8_2_W_gm1_PMOS`` -> ``W``, ``CAPACITOR_0`` -> ``CAPACITOR``.
+    """
+    match = _MOSFET_KIND_RE.match(name)
+    if match is not None:
+        return match.group(1).upper()
+    return name.split("_")[0].upper()
+
+
+class SensitivityAnalyzer(object):
+    """Finite-difference Jacobian of ``PerformanceExtractor`` metrics.
+
+    All perturbed netlists are simulated concurrently through a
+    ``SimulationCache``, so the nominal point (and any perturbation already
+    seen) is not simulated again.
+    """
+
+    def __init__(
+        self,
+        netlist_path,
+        cache_dir,
+        params=None,
+        method="central",
+        rel_steps=None,
+        max_workers=None,
+        simulator="ngspice",
+        timeout=None,
+        analysis_timeout=None,
+    ):
+        if method not in ("forward", "central"):
+            raise ValueError("method must be 'forward' or 'central': %r" % method)
+
+        with open(netlist_path) as f:
+            self.netlist = f.read()
+        self.source_dir = os.path.dirname(os.path.abspath(netlist_path))
+        self.cache = SimulationCache(
+            cache_dir, simulator=simulator, timeout=timeout, analysis_timeout=analysis_timeout
+        )
+        self.method = method
+        self.rel_steps = dict(DEFAULT_REL_STEPS, **(rel_steps or {}))
+        self.max_workers = max_workers or os.cpu_count()
+
+        self.nominal = read_params(self.netlist)
+        if params is None:
+            params = [name for name in self.nominal if TUNABLE_RE.match(name)]
+        self.param_names = list(params)
+        self.metric_names = list(METRICS)
+
+    def perturbations(self, name):
+        """Return ``(low, high)`` parameter values used for ``name``.
+
+        ``M`` multipliers stay integers and never drop below 1; when the
+        backward point would be invalid, a forward difference is used.
+        """
+        x0 = self.nominal[name]
+        kind = param_kind(name)
+        rel_step = self.rel_steps.get(kind, 0.01)
+        h = rel_step * abs(x0) if x0 else rel_step
+
+        if kind == "M":
+            h = max(1, int(round(h)))
+            low = x0 - h if self.method == "central" and x0 - h >= 1 else x0
+            return low, x0 + h
+
+        if self.method == "central":
+            return x0 - h, x0 + h
+        return x0, x0 + h
+
+    def _evaluate(self, overrides):
+        """Return the metrics of one point, or NaN if it produced no usable output.
+
+        Only a failed simulation or missing/unparsable ``ac.csv``/``dc.csv``
+        become NaN (and are logged with their run dir); errors raised while
+        computing the metrics themselves propagate.
+        """
+        nan = np.full(len(self.metric_names), np.nan)
+        netlist = set_params(self.netlist, overrides) if overrides else self.netlist
+        try:
+            run_dir = self.cache.run(netlist, self.source_dir)
+        except SimulationError as e:
+            logger.warning("%s: %s is NaN", e, overrides or "nominal point")
+            return nan
+
+        extractor = PerformanceExtractor(run_dir)
+        try:
+            extractor.parse_output(run_dir)
+        except (OSError, IndexError, ValueError) as e:
+            logger.warning("unusable output in %s (%s): %s is NaN", run_dir, e, overrides or "nominal point")
+            return nan
+        result = extractor.extract()
+        return np.array([float(result[m]) for m in self.metric_names])
+
+    def jacobian(self):
+        """Return d(metric)/d(param) with shape ``(n_metrics, n_params)``.
+
+        Rows follow ``self.metric_names`` and columns ``self.param_names``.
+        Failed simulations show up as NaN entries.
+        """
+        points = {(): {}}
+        for name in self.param_names:
+            for value in self.perturbations(name):
+                if value != self.nominal[name]:
+                    points[(name, value)] = {name: value}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            keys = list(points)
+            values = dict(zip(keys, pool.map(self._evaluate, [points[k] for k in keys])))
+
+        jac = np.empty((len(self.metric_names), len(self.param_names)))
+        for j, name in enumerate(self.param_names):
+            low, high = self.perturbations(name)
+            f_low = values[(name, low)] if low != self.nominal[name] else values[()]
+            f_high = values[(name, high)]
+            jac[:, j] = (f_high - f_low) / (high - low)
+        return jac
+
+
+if __name__ == "__main__":
+    analyzer = SensitivityAnalyzer(sys.argv[1], sys.argv[2])
+    jac = analyzer.jacobian()
+    for name, column in zip(analyzer.param_names, jac.T):
+        print(name, " ".join("%s=%.4g" % kv for kv in zip(analyzer.metric_names, column)))
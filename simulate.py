@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+
+from netlist import absolutize_includes
+
+
+DECK_NAME = "circuit.cir"
+DONE_MARKER = ".done"
+FAILURE_NAME = "failure.json"
+
+# (reason, pattern) pairs matched against every line ngspice prints. When
+# gmin and then source stepping fail, ngspice still falls back to a
+# transient operating point ("Note: Transient op started"), which often
+# converges, so only the failure of that last fallback is fatal.
+FATAL_PATTERNS = [
+    ("timestep_too_small", r"timestep too small"),
+    ("transient_op_failed", r"transient op failed"),
+    ("iteration_limit", r"iteration limit reached"),
+    ("aborted", r"simulation\(s\) aborted"),
+]
+WARNING_PATTERNS = [
+    ("gmin_stepping_failed", r"gmin stepping failed"),
+    ("source_stepping_failed", r"source stepping failed"),
+    ("singular_matrix", r"singular matrix"),
+    ("warning", r"^\s*warning\b"),
+]
+# ngspice prints this at the start of every analysis
+ANALYSIS_START_RE = re.compile(r"doing analysis at temp", re.I)
+
+
+def simulator_command(simulator):
+    if isinstance(simulator, str):
+        return shlex.split(simulator)
+    return list(simulator)
+
+
+def _compile(patterns):
+    return [(reason, re.compile(pattern, re.I)) for reason, pattern in patterns]
+
+
+class SimulationError(Exception):
+    """Raised by ``SimulationCache.run`` when a run fails.
+
+    ``failure`` is the ``SimulationResult.failure`` record of the run.
+    """
+
+    def __init__(self, run_dir, failure):
+        super(SimulationError, self).__init__(
+            "simulation in %s failed: %s" % (run_dir, failure["reason"])
+        )
+        self.run_dir = run_dir
+        self.failure = failure
+
+
+class SimulationResult(object):
+    """Outcome of one ngspice run.
+
+    ``failure`` is ``None`` for a successful run, otherwise a dict with the
+    ``reason`` (a key of ``FATAL_PATTERNS``, ``"timeout"``,
+    ``"analysis_timeout"`` or ``"exit_status"``), the offending ``line`` and
+    the seconds ``elapsed`` before the run was stopped, i.e. the time wasted
+    on it. ``warnings`` lists ``(reason, line)`` pairs.
+    """
+
+    def __init__(self, returncode, log, elapsed, failure=None, warnings=None):
+        self.returncode = returncode
+        self.log = log
+        self.elapsed = elapsed
+        self.failure = failure
+        self.warnings = warnings or []
+
+    @property
+    def ok(self):
+        return self.failure is None
+
+
+def _kill(proc):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+    proc.wait()
+
+
+def run_ngspice(
+    deck_path,
+    simulator="ngspice",
+    timeout=None,
+    analysis_timeout=None,
+    fatal_patterns=FATAL_PATTERNS,
+    warning_patterns=WARNING_PATTERNS,
+):
+    """Run ``deck_path`` in batch mode from the deck's own directory.
+
+    Output files written by ``wrdata`` therefore land next to the deck.
+    The merged stdout/stderr is watched line by line and the simulator is
+    killed as soon as a fatal pattern shows up, the whole run exceeds
+    ``timeout`` seconds, or a single analysis exceeds ``analysis_timeout``
+    seconds. Returns a ``SimulationResult``.
+    """
+    fatal_patterns = _compile(fatal_patterns)
+    warning_patterns = _compile(warning_patterns)
+
+    workdir, deck_name = os.path.split(os.path.abspath(deck_path))
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        simulator_command(simulator) + ["-b", deck_name],
+        cwd=workdir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+        errors="replace",
+        start_new_session=hasattr(os, "killpg"),
+    )
+
+    lines = queue.Queue()
+
+    def reader():
+        try:
+            for line in proc.stdout:
+                lines.put(line)
+        finally:
+            lines.put(None)
+
+    reader_thread = threading.Thread(target=reader, daemon=True)
+    reader_thread.start()
+
+    log, warnings, failure = [], [], None
+    analysis_start = start
+    while True:
+        now = time.monotonic()
+        deadlines = []
+        if timeout is not None:
+            deadlines.append((start + timeout, "timeout"))
+        if analysis_timeout is not None:
+            deadlines.append((analysis_start + analysis_timeout, "analysis_timeout"))
+        deadline, reason = min(deadlines) if deadlines else (None, None)
+
+        try:
+            line = lines.get(timeout=None if deadline is None else max(0, deadline - now))
+        except queue.Empty:
+            failure = {"reason": reason, "line": None}
+            break
+        if line is None:
+            break
+
+        log.append(line)
+        if ANALYSIS_START_RE.search(line):
+            analysis_start = time.monotonic()
+        fatal = next((r for r, p in fatal_patterns if p.search(line)), None)
+        if fatal is not None:
+            failure = {"reason": fatal, "line": line.strip()}
+            break
+        warning = next((r for r, p in warning_patterns if p.search(line)), None)
+        if warning is not None:
+            warnings.append((warning, line.strip()))
+
+    if failure is not None:
+        _kill(proc)
+    returncode = proc.wait()
+    # the reader sees EOF once the process is gone; only then close the pipe
+    reader_thread.join()
+    proc.stdout.close()
+    elapsed = time.monotonic() - start
+    if failure is None and returncode != 0:
+        failure = {"reason": "exit_status", "line": log[-1].strip() if log else None}
+    if failure is not None:
+        failure["elapsed"] = elapsed
+    return SimulationResult(returncode, "".join(log), elapsed, failure, warnings)
+
+
+class SimulationCache(object):
+    """Content-addressed directory of simulation runs.
+
+    Each netlist is written to ``<cache_dir>/<sha1 of netlist>/circuit.cir``
+    and simulated there, so identical netlists (e.g. the nominal design of
+    an optimization step) are only ever simulated once. Failed runs are not
+    cached; their ``failure`` record is kept in ``failure.json`` and
+    ``run`` raises ``SimulationError``.
+    """
+
+    def __init__(self, cache_dir, simulator="ngspice", timeout=None, analysis_timeout=None):
+        self.cache_dir = cache_dir
+        self.simulator = simulator
+        self.timeout = timeout
+        self.analysis_timeout = analysis_timeout
+
+    @staticmethod
+    def key(netlist):
+        return hashlib.sha1(netlist.encode("utf-8")).hexdigest()
+
+    def run_dir(self, netlist):
+        return os.path.join(self.cache_dir, self.key(netlist))
+
+    def is_cached(self, netlist):
+        return os.path.isfile(os.path.join(self.run_dir(netlist), DONE_MARKER))
+
+    def failure(self, netlist):
+        """Return the failure record of the last run of ``netlist``, if any."""
+        path = os.path.join(self.run_dir(netlist), FAILURE_NAME)
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def run(self, netlist, source_dir="."):
+        """Simulate ``netlist`` unless already cached and return its run dir.
+
+        ``source_dir`` is the directory the netlist was written for; relative
+        includes are resolved against it. Outputs of an earlier failed
+        attempt are removed first, so a run dir never mixes two runs.
+        Raises ``SimulationError`` if the run fails.
+        """
+        run_dir = self.run_dir(netlist)
+        if self.is_cached(netlist):
+            return run_dir
+
+        if os.path.isdir(run_dir):
+            shutil.rmtree(run_dir)
+        os.makedirs(run_dir)
+        deck_path = os.path.join(run_dir, DECK_NAME)
+        with open(deck_path, "w") as f:
+            f.write(absolutize_includes(netlist, source_dir))
+
+        result = run_ngspice(deck_path, self.simulator, self.timeout, self.analysis_timeout)
+        with open(os.path.join(run_dir, "ngspice.log"), "w") as f:
+            f.write(result.log)
+        failure_path = os.path.join(run_dir, FAILURE_NAME)
+        if result.ok:
+            open(os.path.join(run_dir, DONE_MARKER), "w").close()
+        else:
+            with open(failure_path, "w") as f:
+                json.dump(dict(result.failure, warnings=result.warnings), f, indent=2)
+            raise SimulationError(run_dir, result.failure)
+        return run_dir
@@ -0,0 +1,58 @@
+"""Stand-in for ``ngspice -b <deck>`` used by the tests.
+
+It reads the ``.param`` values of the deck and writes ``ac.csv``/``dc.csv``
+in the same layout as the real decks, for a two-pole amplifier with
+DC gain ``1000 * W * M``, poles at ``1 kHz`` and ``10 MHz`` and supply
+current ``10 * CURRENT_0_BIAS``. The ``.ac dec|lin`` card of the deck is
+honoured.
+"""
+import re
+import sys
+
+import numpy as np
+
+SPICE_SUFFIXES = {"f": 1e-15, "p": 1e-12, "n": 1e-9, "u": 1e-6, "m": 1e-3, "k": 1e3}
+
+
+def read_params(text):
+    params = {}
+    for name, value in re.findall(r"(\w+)\s*=\s*([\d.eE+-]+[a-zA-Z]?)", text):
+        scale = SPICE_SUFFIXES.get(value[-1].lower(), 1.0) if value[-1].isalpha() else 1.0
+        params[name] = float(value.rstrip("fpnumkFPNUMK")) * scale
+    return params
+
+
+def response(freq, a0):
+    return a0 / ((1 + 1j * freq / 1e3) * (1 + 1j * freq / 1e7))
+
+
+def ac_grid(text):
+    match = re.search(r"^\.ac\s+(dec|lin)\s+(\d+)\s+(\S+)\s+(\S+)", text, re.M | re.I)
+    if match is None:
+        return np.logspace(0, 9, 91)
+    variation, points, fstart, fstop = match.groups()
+    if variation.lower() == "lin":
+        return np.linspace(float(fstart), float(fstop), int(points))
+    decades = np.log10(float(fstop)) - np.log10(float(fstart))
+    return np.logspace(np.log10(float(fstart)), np.log10(float(fstop)), int(round(decades * int(points))) + 1)
+
+
+def main(deck):
+    with open(deck) as f:
+        text = f.read()
+    params = read_params(text)
+
+    a0 = 1000 * params["MOSFET_8_2_W_gm1_PMOS"] * params["MOSFET_8_2_M_gm1_PMOS"]
+    freq = ac_grid(text)
+    vout = response(freq, a0)
+    with open("ac.csv", "w") as f:
+        f.write(" frequency      v(opout)       v(opout)\n")
+        for fr, v in zip(freq, vout):
+            f.write(" %.7e %.7e %.7e\n" % (fr, v.real, v.imag))
+    with open("dc.csv", "w") as f:
+        f.write(" vdd            i(V1)\n")
+        f.write(" 1.8000000e+00 %.7e\n" % (-10 * params["CURRENT_0_BIAS"]))
+
+
+if __name__ == "__main__":
+    main(sys.argv[-1])
@@ -0,0 +1,24 @@
+"""Stand-in for ``ngspice -b <deck>`` that replays a script from the deck.
+
+Comment lines of the form ``* emit <text>``, ``* sleep <seconds>`` and
+``* exit <status>`` are executed in order, so tests can fake the log of a
+converging or a hanging simulation.
+"""
+import sys
+import time
+
+
+def main(deck):
+    with open(deck) as f:
+        for line in f:
+            command, _, arg = line[1:].strip().partition(" ") if line.startswith("*") else ("", "", "")
+            if command == "emit":
+                print(arg, flush=True)
+            elif command == "sleep":
+                time.sleep(float(arg))
+            elif command == "exit":
+                sys.exit(int(arg))
+
+
+if __name__ == "__main__":
+    main(sys.argv[-1])
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import scipy.optimize as sciopt
+
+from adaptive_ac import AdaptiveACAnalyzer, compare_with_fixed_grid, merge_ac
+from netlist import read_ac_sweep, set_ac_sweep
+from simulate import SimulationError
+
+sys.path.insert(0, os.path.abspath("tests"))
+from fake_ngspice import response  # noqa: E402
+
+FAKE_NGSPICE = [sys.executable, os.path.abspath("tests/fake_ngspice.py")]
+
+NETLIST = """Fake amplifier
+.PARAM
++ MOSFET_8_2_W_gm1_PMOS=2 MOSFET_8_2_M_gm1_PMOS=100 CURRENT_0_BIAS=630n
+.ac dec 20 1 1e12
+.end
+"""
+
+
+def test_ac_sweep_card():
+    assert read_ac_sweep(NETLIST) == ("dec", 20, 1.0, 1e12)
+    netlist = set_ac_sweep(NETLIST, "lin", 41, 1e6, 4e6)
+    assert ".ac lin 41 1000000 4000000\n" in netlist
+    assert read_ac_sweep(netlist) == ("lin", 41, 1e6, 4e6)
+
+
+def test_adaptive_ac(tmp_path):
+    deck = tmp_path / "amp.cir"
+    deck.write_text(NETLIST)
+    analyzer = AdaptiveACAnalyzer(str(deck), str(tmp_path / "cache"), simulator=FAKE_NGSPICE)
+
+    a0 = 1000 * 2 * 100
+    ugbw = sciopt.brentq(lambda f: np.abs(response(f, a0)) - 1, 1, 1e12)
+    pm = 180 + np.angle(response(ugbw, a0), deg=True)
+
+    metrics, points = analyzer.run()
+    assert points < 20 * 12 + 1
+    assert len([d for d in os.listdir(tmp_path / "cache") if d.startswith("adaptive-")]) == 1
+    np.testing.assert_allclose(metrics["ugbw"], ugbw, rtol=1e-4)
+    np.testing.assert_allclose(metrics["pm"], pm, atol=1e-2)
+    np.testing.assert_allclose(metrics["gain"], a0, rtol=1e-3)
+
+    report = compare_with_fixed_grid(analyzer, 20)
+    assert report["fixed"]["points"] == 20 * 12 + 1
+    assert report["adaptive"]["points"] == points
+    assert report["adaptive"]["ugbw_err"] <= report["fixed"]["ugbw_err"]
+    assert report["adaptive"]["pm_err"] <= report["fixed"]["pm_err"]
+
+
+def test_failed_run_raises(tmp_path):
+    deck = tmp_path / "amp.cir"
+    deck.write_text(NETLIST.replace("CURRENT_0_BIAS", "CURRENT_1_BIAS"))
+    analyzer = AdaptiveACAnalyzer(str(deck), str(tmp_path / "cache"), simulator=FAKE_NGSPICE)
+    with pytest.raises(SimulationError):
+        analyzer.run()
+
+
+def test_merge_keeps_header(tmp_path):
+    for name, freq in (("coarse", [1.0, 10.0]), ("dense", [5.0, 10.0])):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "ac.csv").write_text(
+            " frequency      v(out)         v(out)\n"
+            + "".join(" %.7e 1.0000000e+00 0.0000000e+00\n" % f for f in freq)
+        )
+        (tmp_path / name / "dc.csv").write_text(" vdd            i(vdd)\n 1.8 -1e-5\n")
+
+    merged = merge_ac([str(tmp_path / "coarse"), str(tmp_path / "dense")], str(tmp_path / "merged"))
+    with open(os.path.join(merged, "ac.csv")) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == " frequency      v(out)         v(out)"
+    assert [float(line.split()[0]) for line in lines[1:]] == [1.0, 5.0, 10.0]
@@ -0,0 +1,131 @@
+import numpy as np
+
+from measurements import ControlScript, benchmark, read_measurements
+
+OUTPUT = """@run
+@meas ac
+gain_bandwidth_product 2.1892110e+06
+phase_margin -6.3626610e+01
+@vectors ac
+ frequency      v(opout)       v(opout)      vdb(opout)
+ 1.0000000e+00 -1.6165366e+06  3.7725711e+05  1.2441e+02
+ 1.2589254e+00 -1.5691333e+06  4.6101162e+05  1.2424e+02
+@meas op
+ibias
+@vectors op
+ vdd            i(V1)
+ 1.8000000e+00 -1.5690802e-05
+"""
+
+
+def test_control_script():
+    script = ControlScript()
+    script.analysis(
+        "run",
+        label="ac",
+        meas=["ac gain_bandwidth_product when vdb(opout)=0"],
+        vectors=["v(opout)"],
+    )
+    script.analysis("op", vectors=["i(V1)"])
+    control = script.render()
+    assert control.count("wrdata results.meas") == 2
+    assert "echo gain_bandwidth_product $&gain_bandwidth_product >> results.meas" in control
+
+    with open("circuits/CLIA/CLIA-get-pm-directly.cir") as f:
+        netlist = script.apply(f.read())
+    assert netlist.count(".control") == 1
+    assert "CLIA_GBW_PM" not in netlist and "ac.csv" not in netlist
+    assert netlist.rstrip().endswith(".end")
+
+
+def test_read_measurements(tmp_path):
+    path = tmp_path / "results.meas"
+    path.write_text(OUTPUT)
+    data = read_measurements(str(path))
+
+    assert data["gain_bandwidth_product"][0] == 2189211.0
+    assert data["phase_margin"][0] == -63.62661
+    assert np.isnan(data["ibias"][0])
+    np.testing.assert_array_equal(data["ac/frequency"], [1.0, 1.2589254])
+    assert data["ac/v(opout)"][0] == -1.6165366e06 + 3.7725711e05j
+    assert data["ac/vdb(opout)"].dtype == float
+    assert data["op/i(V1)"][0] == -1.5690802e-05
+
+
+def test_benchmark():
+    report = benchmark(runs=5)
+    assert report["legacy"]["files"] == 3
+    assert report["consolidated"]["files"] == 1
+    assert report["consolidated"]["bytes"] < report["legacy"]["bytes"]
+
+
+def test_layouts_hold_the_same_data(tmp_path):
+    from measurements import _read_consolidated, _read_legacy, _write_consolidated, _write_legacy
+
+    ac = np.array([[1.0, -1.6e6, 3.7e5], [1.25, -1.5e6, 4.6e5]])
+    dc = np.array([1.8, -1.5690802e-05])
+    meas = {"gain_bandwidth_product": 2189211.0, "phase_margin": -63.62661}
+    _write_legacy(str(tmp_path), ac, dc, meas)
+    _write_consolidated(str(tmp_path), ac, dc, meas)
+
+    legacy, consolidated = _read_legacy(str(tmp_path)), _read_consolidated(str(tmp_path))
+    for name, value in meas.items():
+        assert legacy["meas/%s" % name][0] == consolidated[name][0] == value
+    for key in ("ac/frequency", "ac/v(opout)", "op/i(V1)"):
+        np.testing.assert_array_equal(legacy[key], consolidated[key])
+
+
+def test_port_nmcf_acdc(tmp_path):
+    script = ControlScript()
+    script.analysis(
+        "dc temp -40 125 1",
+        meas=[
+            "dc maxval MAX V(vout6) from=-40 to=125",
+            "dc minval MIN V(vout6) from=-40 to=125",
+            "dc avgval AVG V(vout6) from=-40 to=125",
+            "dc ppavl PP V(vout6) from=-40 to=125",
+            "dc Ivdd25 FIND I(VVDDDC) AT=25",
+            "dc vout25 FIND V(vout6) AT=25",
+        ],
+        lets=[
+            "TC = ppavl/avgval/165",
+            "Power_ = -1 * Ivdd25 * 1.8",
+            "Power = Power_ * 1e6",
+            "vos25 = vout25 - 1.8 * 0.4",
+        ],
+    )
+    script.analysis(
+        "ac dec 10 0.1 1G",
+        meas=[
+            "ac dcgain_ find vdb(opout) at = 0.1",
+            "ac gain_bandwidth_product_ when vdb(opout)=0",
+            "ac phase_margin find vp(opout) when vdb(opout)=0",
+        ],
+        lets=["dcgain = abs(dcgain_)"],
+    )
+    with open("circuits/NMCF/AMP_NMCF_ACDC.cir") as f:
+        netlist = script.apply(f.read())
+
+    assert "wrdata logs/" not in netlist
+    lines = netlist.splitlines()
+    lets = {
+        "TC": "let TC = ppavl/avgval/165",
+        "Power": "let Power = Power_ * 1e6",
+        "vos25": "let vos25 = vout25 - 1.8 * 0.4",
+    }
+    for name, statement in lets.items():
+        let = lines.index(statement)
+        echo = lines.index("echo %s $&%s >> results.meas" % (name, name))
+        assert lines.index("meas dc vout25 FIND V(vout6) AT=25") < let < echo
+
+    path = tmp_path / "results.meas"
+    path.write_text(
+        "@run\n@meas dc\nmaxval 7.3e-01\nTC 1.2e-05\nPower 2.16e+01\nvos25 3.1e-03\n"
+        "@meas ac\ndcgain_ -1.1e+02\ngain_bandwidth_product_\ndcgain 1.1e+02\n"
+    )
+    data = read_measurements(str(path))
+    assert data["TC"][0] == 1.2e-05
+    assert data["Power"][0] == 21.6
+    assert data["vos25"][0] == 3.1e-03
+    assert data["dcgain"][0] == 110.0
+    assert np.isnan(data["gain_bandwidth_product_"][0])
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+
+from netlist import absolutize_includes, parse_value, read_params, set_params
+from sensitivity import SensitivityAnalyzer
+
+FAKE_NGSPICE = [sys.executable, os.path.abspath("tests/fake_ngspice.py")]
+
+NETLIST = """Fake amplifier
+.include models.txt
+.PARAM supply_voltage = 1.8
+.PARAM
++ MOSFET_8_2_W_gm1_PMOS=2 MOSFET_8_2_M_gm1_PMOS=100
++ CURRENT_0_BIAS=630n CAPACITOR_0=347f CLOAD=560p
+.end
+"""
+
+
+def test_netlist_params():
+    params = read_params(NETLIST)
+    assert params["CURRENT_0_BIAS"] == parse_value("630n")
+    assert parse_value("247.56K") == 247560.0
+    assert parse_value("10meg") == 1e7
+
+    changed = read_params(set_params(NETLIST, {"current_0_bias": 1e-6, "MOSFET_8_2_M_gm1_PMOS": 101}))
+    assert changed["CURRENT_0_BIAS"] == 1e-6
+    assert changed["MOSFET_8_2_M_gm1_PMOS"] == 101
+    assert changed["CAPACITOR_0"] == params["CAPACITOR_0"]
+
+    assert ".include /models/models.txt" in absolutize_includes(NETLIST, "/models")
+
+
+def test_jacobian(tmp_path):
+    deck = tmp_path / "amp.cir"
+    deck.write_text(NETLIST)
+    analyzer = SensitivityAnalyzer(str(deck), str(tmp_path / "cache"), simulator=FAKE_NGSPICE)
+
+    # CLOAD is a testbench parameter, not a tunable one
+    assert analyzer.param_names == [
+        "MOSFET_8_2_W_gm1_PMOS",
+        "MOSFET_8_2_M_gm1_PMOS",
+        "CURRENT_0_BIAS",
+        "CAPACITOR_0",
+    ]
+    low, high = analyzer.perturbations("MOSFET_8_2_M_gm1_PMOS")
+    assert (low, high) == (95, 105)
+
+    jac = analyzer.jacobian()
+    assert jac.shape == (4, 4)
+    gain, power = analyzer.metric_names.index("gain"), analyzer.metric_names.index("power")
+    np.testing.assert_allclose(jac[gain, :2], [1000 * 100, 1000 * 2], rtol=1e-3)
+    np.testing.assert_allclose(jac[power, 2], 10, rtol=1e-3)
+    np.testing.assert_allclose(jac[:, 3], 0, atol=1e-6)
+
+    # a second pass only hits the cache
+    runs = len(os.listdir(tmp_path / "cache"))
+    analyzer.jacobian()
+    assert len(os.listdir(tmp_path / "cache")) == runs == 1 + 2 * 4
+
+
+def test_failed_runs_are_nan(tmp_path):
+    deck = tmp_path / "amp.cir"
+    deck.write_text(NETLIST)
+    # the fake simulator cannot find the supply current and exits non-zero
+    analyzer = SensitivityAnalyzer(
+        str(deck), str(tmp_path / "cache"), params=["CAPACITOR_0"], simulator=FAKE_NGSPICE
+    )
+    analyzer.netlist = analyzer.netlist.replace("CURRENT_0_BIAS", "CURRENT_1_BIAS")
+    assert np.isnan(analyzer.jacobian()).all()
+
+
+def test_missing_output_is_nan_and_logged(tmp_path, caplog):
+    deck = tmp_path / "amp.cir"
+    deck.write_text(NETLIST)
+    # exits cleanly without writing ac.csv/dc.csv
+    scripted = [sys.executable, os.path.abspath("tests/scripted_ngspice.py")]
+    analyzer = SensitivityAnalyzer(
+        str(deck), str(tmp_path / "cache"), params=["CAPACITOR_0"], simulator=scripted
+    )
+    assert np.isnan(analyzer.jacobian()).all()
+    assert str(tmp_path / "cache") in caplog.text
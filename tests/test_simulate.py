@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from simulate import SimulationCache, SimulationError, run_ngspice
+
+SCRIPTED_NGSPICE = [sys.executable, os.path.abspath("tests/scripted_ngspice.py")]
+
+
+def write_deck(tmp_path, *script):
+    deck = tmp_path / "circuit.cir"
+    deck.write_text("Scripted run\n" + "".join("* %s\n" % line for line in script) + ".end\n")
+    return str(deck)
+
+
+def test_converging_run(tmp_path):
+    deck = write_deck(
+        tmp_path,
+        "emit Doing analysis at TEMP = 27.000000 and TNOM = 27.000000",
+        "emit Warning: singular matrix:  check node x1.net5",
+        "emit Doing analysis at TEMP = 27.000000 and TNOM = 27.000000",
+        "emit No. of Data Rows : 101",
+    )
+    result = run_ngspice(deck, SCRIPTED_NGSPICE, timeout=10)
+    assert result.ok
+    assert result.returncode == 0
+    assert [reason for reason, _ in result.warnings] == ["singular_matrix"]
+    assert "No. of Data Rows" in result.log
+
+
+def test_fatal_pattern_kills_run(tmp_path):
+    deck = write_deck(
+        tmp_path,
+        "emit Doing analysis at TEMP = 27.000000 and TNOM = 27.000000",
+        "emit doAnalyses: TRAN:  Timestep too small; time = 1.2e-07, timestep = 1.25e-21",
+        "sleep 30",
+    )
+    start = time.monotonic()
+    result = run_ngspice(deck, SCRIPTED_NGSPICE, timeout=20)
+    assert time.monotonic() - start < 5
+    assert result.failure["reason"] == "timestep_too_small"
+    assert "Timestep too small" in result.failure["line"]
+    assert result.failure["elapsed"] < 5
+
+
+def test_analysis_timeout(tmp_path):
+    # each analysis stays within budget, the last one hangs
+    deck = write_deck(
+        tmp_path,
+        "emit Doing analysis at TEMP = 27.000000 and TNOM = 27.000000",
+        "sleep 0.3",
+        "emit Doing analysis at TEMP = 27.000000 and TNOM = 27.000000",
+        "sleep 0.3",
+        "emit Doing analysis at TEMP = 27.000000 and TNOM = 27.000000",
+        "sleep 30",
+    )
+    result = run_ngspice(deck, SCRIPTED_NGSPICE, analysis_timeout=0.5)
+    assert result.failure["reason"] == "analysis_timeout"
+    assert 1.1 < result.failure["elapsed"] < 5
+
+    result = run_ngspice(deck, SCRIPTED_NGSPICE, timeout=0.5)
+    assert result.failure["reason"] == "timeout"
+
+
+def test_cache_records_failure(tmp_path):
+    cache = SimulationCache(str(tmp_path / "cache"), simulator=SCRIPTED_NGSPICE)
+    netlist = "Scripted run\n* emit run simulation(s) aborted\n* exit 1\n.end\n"
+    run_dir = cache.run_dir(netlist)
+    os.makedirs(run_dir)
+    # left over from an earlier attempt, must not survive the retry
+    open(os.path.join(run_dir, "ac.csv"), "w").close()
+    with pytest.raises(SimulationError) as excinfo:
+        cache.run(netlist)
+    assert excinfo.value.failure["reason"] == "aborted"
+    assert not os.path.exists(os.path.join(run_dir, "ac.csv"))
+    assert not cache.is_cached(netlist)
+    assert cache.failure(netlist)["reason"] == "aborted"
+    with open(os.path.join(run_dir, "failure.json")) as f:
+        assert json.load(f)["line"] == "run simulation(s) aborted"
+
+    netlist = "Scripted run\n* exit 1\n.end\n"
+    with pytest.raises(SimulationError):
+        cache.run(netlist)
+    assert cache.failure(netlist)["reason"] == "exit_status"
+
+
+def test_undecodable_output(tmp_path):
+    script = tmp_path / "binary_ngspice.py"
+    script.write_text("import sys\nsys.stdout.buffer.write(b'\\xff\\xfe\\n')\nprint('done')\n")
+    result = run_ngspice(write_deck(tmp_path), [sys.executable, str(script)])
+    assert result.ok
+    assert result.log.endswith("done\n")
+
+
+def test_source_stepping_falls_back_to_transient_op(tmp_path):
+    deck = write_deck(
+        tmp_path,
+        "emit Warning: Dynamic gmin stepping failed",
+        "emit Warning: source stepping failed",
+        "emit Note: Transient op started",
+        "emit Note: Transient op finished successfully",
+        "emit No. of Data Rows : 101",
+    )
+    result = run_ngspice(deck, SCRIPTED_NGSPICE, timeout=10)
+    assert result.ok
+    assert "source_stepping_failed" in [reason for reason, _ in result.warnings]
+
+    deck = write_deck(
+        tmp_path,
+        "emit Warning: source stepping failed",
+        "emit Note: Transient op started",
+        "emit Warning: Transient op failed",
+        "sleep 30",
+    )
+    result = run_ngspice(deck, SCRIPTED_NGSPICE, timeout=20)
+    assert result.failure["reason"] == "transient_op_failed"
+    assert result.failure["elapsed"] < 5